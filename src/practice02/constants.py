@@ -6,14 +6,17 @@ RATE_LIMIT_WINDOW_SECONDS: Final[float] = 5.0
 RATE_LIMIT_WINDOW_MAX_REQUESTS: Final[int] = 10  # Max requests before blacklisting
 RATE_LIMIT_MIN_INTERVAL: Final[float] = 0.5  # 500ms between requests
 BLACKLIST_DURATION: Final[float] = 10.0  # seconds
-MAX_TIMESTAMPS_STORED: Final[int] = 1000  # Max timestamps to store per IP
+RATE_LIMIT_BUCKET_SECONDS: Final[float] = 0.5  # Granularity of the per-IP request counters
+RATE_LIMIT_BUCKETS: Final[int] = int(RATE_LIMIT_WINDOW_SECONDS / RATE_LIMIT_BUCKET_SECONDS)
+MAX_IPS_TRACKED: Final[int] = 100_000  # Least recently seen IPs are forgotten past this
+MAX_BLACKLISTED_IPS: Final[int] = 10_000  # Oldest blacklist entries are dropped past this
+RATE_LIMIT_IDLE_TTL: Final[float] = 2 * RATE_LIMIT_WINDOW_SECONDS  # Forget IPs idle for longer than this
 
 # Error messages
 ERROR_METHOD_NOT_ALLOWED: Final[str] = "Method Not Allowed"
 ERROR_RATE_LIMIT_EXCEEDED: Final[str] = "Rate limit exceeded"
 ERROR_BLACKLISTED_IP: Final[str] = "This IP is temporarily blacklisted"
 ERROR_NUMBER_TOO_LARGE: Final[str] = "Number is too large for current payment plan. Do you think electricity is free?"
-ERROR_VALIDATION: Final[str] = "Validation error"
 
 # Default values
 DEFAULT_MOTD: Final[str] = "Welcome to our API!"
@@ -23,6 +26,9 @@ API_TITLE: Final[str] = "Practice 02 API"
 API_DESCRIPTION: Final[str] = "API for Practice 02 - Web Services Development"
 API_VERSION: Final[str] = "1.0.0"
 
+# Server configuration
+SERVER_KEEP_ALIVE_SECONDS: Final[int] = 75  # Keep idle connections open for clients that reuse them, also set in the Dockerfile
+
 # Prime number limits
 PRIME_NUMBER_MAX: Final[int] = 1000
 
@@ -1,5 +1,6 @@
+import functools
 from http import HTTPStatus
-from typing import Final
+from typing import ClassVar, Final
 
 from . import constants as const
 
@@ -7,6 +8,10 @@ ENHANCE_YOUR_CALM: Final[int] = 420
 
 class APIError(Exception):
     """Base class for API errors."""
+    # Set on subclasses that are always raised with the same status, title and detail,
+    # so a single response can be cached for the whole class
+    static: ClassVar[bool] = False
+    _static_body: ClassVar[bytes | None] = None
     status_code: int
     title: str
     detail: str
@@ -17,10 +22,27 @@ class APIError(Exception):
         self.detail = detail
         super().__init__(detail)
 
+    @functools.cached_property
+    def body(self) -> bytes:
+        """The JSON problem response body for this error, serialized on first access."""
+        cls = type(self)
+        static_body: bytes | None = vars(cls).get("_static_body")
+        if static_body is not None:
+            return static_body
+        # Imported here as the response models themselves depend on this module
+        from .response.json_response import problem_body
+
+        body = problem_body(self.status_code, self.title, self.detail)
+        if cls.static:
+            cls._static_body = body
+        return body
+
 class NumberTooLargeError(APIError):
     """Raised when a number exceeds the allowed limit."""
-    def __init__(self, detail: str = const.ERROR_NUMBER_TOO_LARGE) -> None:
-        super().__init__(HTTPStatus.PAYMENT_REQUIRED, "Payment Required", detail)
+    static = True
+
+    def __init__(self) -> None:
+        super().__init__(HTTPStatus.PAYMENT_REQUIRED, "Payment Required", const.ERROR_NUMBER_TOO_LARGE)
 
 class ResourceExistsError(APIError):
     """Raised when trying to create a resource that already exists."""
@@ -37,6 +59,6 @@ class MethodNotAllowedError(APIError):
     def __init__(self, method: str) -> None:
         super().__init__(
             HTTPStatus.METHOD_NOT_ALLOWED,
-            "Method Not Allowed",
+            const.ERROR_METHOD_NOT_ALLOWED,
             f"{method} method not allowed"
         )
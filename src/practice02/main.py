@@ -1,20 +1,26 @@
+import atexit
+import functools
 import logging
 from http import HTTPStatus
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from typing import Any
 
+import orjson
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
 from starlette.responses import Response
 
 from .middleware.logging_middleware import LoggingMiddleware
+from .middleware.method_guard_middleware import MethodGuardMiddleware
 from .middleware.rate_limit_middleware import RateLimitMiddleware
 from .request.motd_request import MOTDUpdate
 from .request.number_request import NumberRequest
 from .request.prime_check_request import PrimeCheckRequest
-from .response.api_response import APIResponse
-from .response.json_response import JSONProblem
-from .utils import is_prime
+from .response.api_response import APIResponse, cached_json_response
+from .response.json_response import problem_body, problem_payload
+from .response.orjson_response import ORJSONResponse
+from .utils import get_client_ip, is_prime
 from .state import State
 from . import constants as const
 
@@ -23,119 +29,173 @@ from .errors import (
     APIError,
     ResourceExistsError,
     ResourceNotFoundError,
-    MethodNotAllowedError,
 )
 
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
+# Records are only queued by the request handling code, a background thread formats and writes them.
+_log_queue: SimpleQueue[logging.LogRecord] = SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(
+    logging.Formatter(
+        fmt="[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
 )
+_log_queue_handler = QueueHandler(_log_queue)
+_log_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_log_queue_handler])
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+# Flush the records still queued on shutdown, the listener thread would otherwise drop them
+atexit.register(_log_listener.stop)
 logger: logging.Logger = logging.getLogger(__name__)
 
+_OK_STATUS: str = str(int(HTTPStatus.OK))
+
+
+def _success(data: Any) -> dict[str, Any]:
+    """Build a successful (200) API response payload.
+
+    Same shape as ``APIResponse.success(...).model_dump()``, without instantiating the generic model.
+    """
+    return {"status": _OK_STATUS, "data": data}
+
+
+# Static response bodies, serialized once instead of on every request
+_OK_200_BODY: bytes = (
+    APIResponse[dict[str, bool]]
+    .success(data={"ok": True}, status_code=status.HTTP_200_OK)
+    .model_dump_json()
+    .encode()
+)
+_OK_201_BODY: bytes = (
+    APIResponse[dict[str, bool]]
+    .success(data={"ok": True}, status_code=status.HTTP_201_CREATED)
+    .model_dump_json()
+    .encode()
+)
+_HEALTH_BODY: bytes = (
+    APIResponse[dict[str, str]]
+    .success(data={"status": "healthy"}, status_code=status.HTTP_200_OK)
+    .model_dump_json()
+    .encode()
+)
+_PUT_PRIME_501_BODY: bytes = (
+    APIResponse[dict[str, str]](
+        status=str(status.HTTP_501_NOT_IMPLEMENTED),
+        data={
+            "error": (
+                "Not implemented, I am sure I can make any number you want a prime number, "
+                "but this HTTP response body is too small..."
+            )
+        },
+    )
+    .model_dump_json()
+    .encode()
+)
+_DELETE_PRIME_501_BODY: bytes = (
+    APIResponse[dict[str, str]](
+        status=str(status.HTTP_501_NOT_IMPLEMENTED),
+        data={
+            "error": (
+                "Not implemented, I am sure I can stop any number you want from being a prime number, "
+                "but this HTTP response body is too small..."
+            )
+        },
+    )
+    .model_dump_json()
+    .encode()
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _root_body(motd: str | None) -> bytes:
+    """Serialize the root endpoint body, only again once the MOTD has changed."""
+    return orjson.dumps(_success({"Hello": "World", "last_motd": motd}))
+
+
+_INTERNAL_SERVER_ERROR_BODY: bytes = problem_body(
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    "Internal Server Error",
+    HTTPStatus.INTERNAL_SERVER_ERROR.description,
+)
+
+
 def create_app(enable_rate_limiting: bool = True) -> FastAPI:
     """
     Create and configure the FastAPI application.
 
     We need to wrap this so we can configure how the app is built for testing.
     """
-    logger.info(f"Creating app, rate_limiting = {enable_rate_limiting}")
+    logger.info("Creating app, rate_limiting = %s", enable_rate_limiting)
+    state = State()
+    # The special number handlers rely on O(1) membership checks, add and remove
+    assert isinstance(state.special_numbers, set), "state.special_numbers must be a set"
     app = FastAPI(
         title=const.API_TITLE,
         description=const.API_DESCRIPTION,
         version=const.API_VERSION,
         docs_url="/docs",
         redoc_url="/redoc",
+        default_response_class=ORJSONResponse,
     )
+    # The handlers reach the state through this closure, it is also exposed for inspection
+    app.state.store = state
 
-    # Add middleware
+    # Add middleware, the last one added runs first
+    # The method guard reads the route table when the middleware stack is built, on the first request
+    app.add_middleware(MethodGuardMiddleware, routes=app.routes)
     app.add_middleware(LoggingMiddleware)
     if enable_rate_limiting:
-        app.add_middleware(RateLimitMiddleware)
+        app.add_middleware(RateLimitMiddleware, state=state)
 
     # Exception handlers
     @app.exception_handler(APIError)
-    async def api_error_handler(request: Request, exc: APIError) -> JSONResponse:
+    async def api_error_handler(request: Request, exc: APIError) -> Response:
         """Handle API errors."""
-        problem = JSONProblem.from_exception(exc)
-        return JSONResponse(status_code=exc.status_code, content=problem.model_dump())
+        return cached_json_response(exc.body, exc.status_code)
 
     @app.exception_handler(HTTPException)
     async def http_exception_handler(
         request: Request, exc: HTTPException
-    ) -> JSONResponse:
+    ) -> ORJSONResponse:
         """Handle HTTP exceptions."""
-        problem = JSONProblem(
-            status=str(exc.status_code),
-            title=exc.detail,
-            detail=str(exc.detail),
-            detail_obj=exc.detail,
-            type=f"https://http.cat/{exc.status_code}",
+        return ORJSONResponse(
+            status_code=exc.status_code,
+            content=problem_payload(exc.status_code, str(exc.detail), str(exc.detail), exc.detail),
         )
-        return JSONResponse(status_code=exc.status_code, content=problem.model_dump())
 
     @app.exception_handler(RequestValidationError)
     async def request_validation_error_handler(
         request: Request, exc: RequestValidationError
-    ) -> JSONResponse:
+    ) -> ORJSONResponse:
         """Handle request validation errors."""
-        problem = JSONProblem(
-            status=str(HTTPStatus.UNPROCESSABLE_ENTITY),
-            title="Unprocessable Entity",
-            detail=str(exc.errors()),
-            detail_obj=exc.errors(),
-            type=f"https://http.cat/{HTTPStatus.UNPROCESSABLE_ENTITY}",
-        )
-        return JSONResponse(
-            status_code=HTTPStatus.UNPROCESSABLE_ENTITY, content=problem.model_dump()
+        errors = exc.errors()
+        return ORJSONResponse(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            content=problem_payload(
+                HTTPStatus.UNPROCESSABLE_ENTITY, "Unprocessable Entity", str(errors), errors
+            ),
         )
 
     @app.exception_handler(Exception)
     async def global_exception_handler(
         request: Request, exc: Exception
-    ) -> JSONResponse:
+    ) -> Response:
         """Handle all other exceptions."""
         logger.error("Unhandled exception: %s", str(exc), exc_info=True)
-        problem = JSONProblem(
-            status=str(HTTPStatus.INTERNAL_SERVER_ERROR),
-            title="Internal Server Error",
-            detail=HTTPStatus.INTERNAL_SERVER_ERROR.description,
-            detail_obj=HTTPStatus.INTERNAL_SERVER_ERROR.description,
-            type=f"https://http.cat/{HTTPStatus.INTERNAL_SERVER_ERROR}",
-        )
-        return JSONResponse(
-            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, content=problem.model_dump()
-        )
+        return cached_json_response(_INTERNAL_SERVER_ERROR_BODY, HTTPStatus.INTERNAL_SERVER_ERROR)
 
     # Root endpoint
     @app.get("/", response_model=APIResponse[dict[str, Any]])
-    async def motd_get() -> dict[str, Any]:
+    async def motd_get() -> Response:
         """Root endpoint that returns a welcome message and the current MOTD.
 
         Returns:
             Dict containing a welcome message and the current MOTD.
         """
-        return (
-            APIResponse[dict[str, Any]]
-            .success(data={"Hello": "World", "last_motd": State.motd})
-            .model_dump()
-        )
-
-    # Block other HTTP methods on root
-    @app.delete(
-        "/", response_model=APIResponse[dict[str, str]], include_in_schema=False
-    )
-    @app.post("/", response_model=APIResponse[dict[str, str]], include_in_schema=False)
-    @app.put("/", response_model=APIResponse[dict[str, str]], include_in_schema=False)
-    async def method_not_allowed() -> dict[str, Any]:
-        """Handle unsupported HTTP methods on the root endpoint.
-
-        Raises:
-            MethodNotAllowedError: Always raises this error for unsupported methods.
-        """
-        raise MethodNotAllowedError(const.ERROR_METHOD_NOT_ALLOWED)
+        return cached_json_response(_root_body(state.motd))
 
     # MOTD endpoints
     @app.put(
@@ -143,7 +203,7 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         response_model=APIResponse[dict[str, bool]],
         status_code=status.HTTP_200_OK,
     )
-    async def motd_put(update: MOTDUpdate) -> dict[str, Any]:
+    async def motd_put(update: MOTDUpdate) -> Response:
         """Update the Message of the Day.
 
         Args:
@@ -152,19 +212,15 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Returns:
             A success response if the MOTD was updated.
         """
-        State.motd = update.message
-        return (
-            APIResponse[dict[str, bool]]
-            .success(data={"ok": True}, status_code=status.HTTP_200_OK)
-            .model_dump()
-        )
+        state.motd = update.message
+        return cached_json_response(_OK_200_BODY)
 
     @app.delete(
         "/motd",
         response_model=APIResponse[dict[str, bool]],
         status_code=status.HTTP_200_OK,
     )
-    async def motd_delete() -> dict[str, Any]:
+    async def motd_delete() -> Response:
         """Delete the current Message of the Day.
 
         Returns:
@@ -173,36 +229,19 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Raises:
             ResourceNotFoundError: If there is no MOTD to delete.
         """
-        if State.motd is None:
+        if state.motd is None:
             raise ResourceNotFoundError("MOTD")
-        State.motd = None
-        return (
-            APIResponse[dict[str, bool]]
-            .success(data={"ok": True}, status_code=status.HTTP_200_OK)
-            .model_dump()
-        )
-
-    @app.post(
-        "/motd",
-        response_model=APIResponse[dict[str, str]],
-        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-        include_in_schema=False,
-    )
-    async def post_motd_not_allowed() -> None:
-        """Handle POST requests to the MOTD endpoint.
-
-        Raises:
-            MethodNotAllowedError: Always raises this error as POST is not allowed.
-        """
-        raise MethodNotAllowedError("POST")
+        state.motd = None
+        return cached_json_response(_OK_200_BODY)
 
     # IP endpoint
     @app.get(
         "/my_ip",
         response_model=APIResponse[dict[str, str]],
+        response_class=ORJSONResponse,
         status_code=status.HTTP_200_OK,
     )
-    async def ip_get(request: Request) -> dict[str, Any]:
+    async def ip_get(request: Request) -> ORJSONResponse:
         """Get the IP address of the client making the request.
 
         Args:
@@ -211,37 +250,8 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Returns:
             A response containing the client's IP address.
         """
-        client_host: str = request.client.host if request.client else "unknown"
-        return (
-            APIResponse[dict[str, str]]
-            .success(data={"ip": client_host}, status_code=status.HTTP_200_OK)
-            .model_dump()
-        )
-
-    # Block other HTTP methods on /my_ip
-    @app.delete(
-        "/my_ip",
-        response_model=APIResponse[dict[str, str]],
-        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-    )
-    @app.post(
-        "/my_ip",
-        response_model=APIResponse[dict[str, str]],
-        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-    )
-    @app.put(
-        "/my_ip",
-        response_model=APIResponse[dict[str, str]],
-        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-        include_in_schema=False,
-    )
-    async def my_ip_method_not_allowed() -> None:
-        """Handle unsupported HTTP methods on the /my_ip endpoint.
-
-        Raises:
-            MethodNotAllowedError: Always raises this error for unsupported methods.
-        """
-        raise MethodNotAllowedError(HTTPStatus.METHOD_NOT_ALLOWED.description)
+        client_host = get_client_ip(request.scope)
+        return ORJSONResponse(_success({"ip": client_host}))
 
     # Special number endpoints
     @app.post(
@@ -249,9 +259,7 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         response_model=APIResponse[dict[str, bool]],
         status_code=status.HTTP_201_CREATED,
     )
-    async def special_number_create(
-        number_req: NumberRequest, response: Response
-    ) -> dict[str, Any]:
+    async def special_number_create(number_req: NumberRequest) -> Response:
         """Add a new special number.
 
         Args:
@@ -263,16 +271,10 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Raises:
             ResourceExistsError: If the number is already special.
         """
-        if number_req.number in State.special_numbers:
+        if number_req.number in state.special_numbers:
             raise ResourceExistsError("Number")
-        State.special_numbers.add(number_req.number)
-        # Kinda sucks to have to do this and if the project was serious would probably have some better way to do this...
-        response.status_code = status.HTTP_201_CREATED
-        return (
-            APIResponse[dict[str, bool]]
-            .success(data={"ok": True}, status_code=status.HTTP_201_CREATED)
-            .model_dump()
-        )
+        state.special_numbers.add(number_req.number)
+        return cached_json_response(_OK_201_BODY, status.HTTP_201_CREATED)
 
     @app.put(
         "/special_number",
@@ -284,9 +286,7 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
             },
         },
     )
-    async def special_number_update(
-        number_req: NumberRequest, response: Response
-    ) -> dict[str, Any]:
+    async def special_number_update(number_req: NumberRequest) -> Response:
         """Add or update a special number.
 
         Args:
@@ -296,28 +296,18 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
             A success response with status 200 if the number was already special,
             or 201 if it was newly added.
         """
-        if number_req.number in State.special_numbers:
-            return (
-                APIResponse[dict[str, bool]]
-                .success(data={"ok": True}, status_code=status.HTTP_200_OK)
-                .model_dump()
-            )
+        if number_req.number in state.special_numbers:
+            return cached_json_response(_OK_200_BODY)
 
-        State.special_numbers.add(number_req.number)
-        # Kinda sucks to have to do this and if the project was serious would probably have some better way to do this...
-        response.status_code = status.HTTP_201_CREATED
-        return (
-            APIResponse[dict[str, bool]]
-            .success(data={"ok": True}, status_code=status.HTTP_201_CREATED)
-            .model_dump()
-        )
+        state.special_numbers.add(number_req.number)
+        return cached_json_response(_OK_201_BODY, status.HTTP_201_CREATED)
 
     @app.delete(
         "/special_number",
         response_model=APIResponse[dict[str, bool]],
         status_code=status.HTTP_200_OK,
     )
-    async def special_number_delete(number_req: NumberRequest) -> dict[str, Any]:
+    async def special_number_delete(number_req: NumberRequest) -> Response:
         """Remove a number from the special numbers set.
 
         Args:
@@ -329,21 +319,17 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Raises:
             ResourceNotFoundError: If the number was not special.
         """
-        if number_req.number not in State.special_numbers:
+        if number_req.number not in state.special_numbers:
             raise ResourceNotFoundError("Number")
-        State.special_numbers.remove(number_req.number)
-        return (
-            APIResponse[dict[str, bool]]
-            .success(data={"ok": True}, status_code=status.HTTP_200_OK)
-            .model_dump()
-        )
+        state.special_numbers.remove(number_req.number)
+        return cached_json_response(_OK_200_BODY)
 
     @app.get(
         "/special_number",
         response_model=APIResponse[dict[str, bool]],
         status_code=status.HTTP_200_OK,
     )
-    async def special_number_get(number: int) -> dict[str, Any]:
+    async def special_number_get(number: int) -> Response:
         """Check if a number is special.
 
         Args:
@@ -355,13 +341,9 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Raises:
             ResourceNotFoundError: If the number is not special.
         """
-        if number not in State.special_numbers:
+        if number not in state.special_numbers:
             raise ResourceNotFoundError("Number")
-        return (
-            APIResponse[dict[str, bool]]
-            .success(data={"ok": True}, status_code=status.HTTP_200_OK)
-            .model_dump()
-        )
+        return cached_json_response(_OK_200_BODY)
 
     # Prime number endpoints
     @app.post(
@@ -377,7 +359,7 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
             },
         },
     )
-    async def check_prime(prime_req: PrimeCheckRequest) -> dict[str, Any]:
+    async def check_prime(prime_req: PrimeCheckRequest) -> ORJSONResponse:
         """Check if a number is prime.
 
         Args:
@@ -389,51 +371,22 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         Raises:
             NumberTooLargeError: If the number is too large to check.
         """
-        return (
-            APIResponse[dict[str, bool]]
-            .success(
-                data={"is_prime": is_prime(prime_req.number)},
-                status_code=status.HTTP_200_OK,
-            )
-            .model_dump()
-        )
-
-    # Block other HTTP methods on /is_prime
-    @app.get(
-        "/is_prime",
-        response_model=APIResponse[dict[str, str]],
-        status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-        include_in_schema=False,
-    )
-    async def get_prime_not_allowed() -> None:
-        """Handle GET requests to the /is_prime endpoint.
-
-        Raises:
-            MethodNotAllowedError: Always raises this error as GET is not allowed.
-        """
-        raise MethodNotAllowedError("GET")
+        return ORJSONResponse(_success({"is_prime": is_prime(prime_req.number)}))
 
+    # Not implemented HTTP methods on /is_prime
     @app.put(
         "/is_prime",
         response_model=APIResponse[dict[str, str]],
         status_code=status.HTTP_501_NOT_IMPLEMENTED,
         include_in_schema=False,
     )
-    async def put_prime_not_implemented() -> dict[str, Any]:
+    async def put_prime_not_implemented() -> Response:
         """Handle PUT requests to the /is_prime endpoint.
 
         Returns:
             A response indicating that the operation is not implemented.
         """
-        return APIResponse[dict[str, str]](
-            status=str(status.HTTP_501_NOT_IMPLEMENTED),
-            data={
-                "error": (
-                    "Not implemented, I am sure I can make any number you want a prime number, "
-                    "but this HTTP response body is too small..."
-                )
-            },
-        ).model_dump()
+        return cached_json_response(_PUT_PRIME_501_BODY, status.HTTP_501_NOT_IMPLEMENTED)
 
     @app.delete(
         "/is_prime",
@@ -441,21 +394,13 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         status_code=status.HTTP_501_NOT_IMPLEMENTED,
         include_in_schema=False,
     )
-    async def delete_prime_not_implemented() -> dict[str, Any]:
+    async def delete_prime_not_implemented() -> Response:
         """Handle DELETE requests to the /is_prime endpoint.
 
         Returns:
             A response indicating that the operation is not implemented.
         """
-        return APIResponse[dict[str, str]](
-            status=str(status.HTTP_501_NOT_IMPLEMENTED),
-            data={
-                "error": (
-                    "Not implemented, I am sure I can stop any number you want from being a prime number, "
-                    "but this HTTP response body is too small..."
-                )
-            },
-        ).model_dump()
+        return cached_json_response(_DELETE_PRIME_501_BODY, status.HTTP_501_NOT_IMPLEMENTED)
 
     # Health check endpoint
     @app.get(
@@ -463,17 +408,13 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
         response_model=APIResponse[dict[str, str]],
         status_code=status.HTTP_200_OK,
     )
-    async def health_check() -> dict[str, Any]:
+    async def health_check() -> Response:
         """Health check endpoint.
 
         Returns:
             A response indicating the service is healthy.
         """
-        return (
-            APIResponse[dict[str, str]]
-            .success(data={"status": "healthy"}, status_code=status.HTTP_200_OK)
-            .model_dump()
-        )
+        return cached_json_response(_HEALTH_BODY)
 
     return app
 
@@ -481,9 +422,16 @@ def create_app(enable_rate_limiting: bool = True) -> FastAPI:
 real_app = create_app()
 
 if __name__ == "__main__":
+    import os
+
     import uvicorn
 
+    # State is kept in memory per process, so running several workers also splits it between them
     uvicorn.run(
         "src.practice02.main:real_app",
-        reload=True,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=const.SERVER_KEEP_ALIVE_SECONDS,
+        workers=int(os.getenv("WORKERS", "1")),
+        reload=os.getenv("RELOAD", "0") == "1",
     )
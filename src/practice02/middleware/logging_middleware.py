@@ -1,34 +1,52 @@
 import logging
 import time
-from typing import Callable, Awaitable
+from http import HTTPStatus
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils import get_client_ip
 
 logger: logging.Logger = logging.getLogger(__name__)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging HTTP requests and responses."""
+class LoggingMiddleware:
+    """ASGI middleware for logging HTTP requests and responses."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process the request and log relevant information."""
-        client_host: str = request.client.host if request.client else "unknown"
-        logger.info("%s - %s %s", client_host, request.method, request.url.path)
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.INFO):
+            # Nothing to log at this level, unhandled errors are still logged by the global exception handler
+            await self.app(scope, receive, send)
+            return
+
+        client_host = get_client_ip(scope)
+        method: str = scope["method"]
+        path: str = scope["path"]
+        # A single INFO line per request, logged on completion; the start is only useful to track down hangs
+        logger.debug("%s - %s %s", client_host, method, path)
+
+        status_code: int = HTTPStatus.INTERNAL_SERVER_ERROR
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-        start_time: float = time.time()
+        start_time: float = time.perf_counter()
         try:
-            response: Response = await call_next(request)
-            process_time: float = (time.time() - start_time) * 1000
-            logger.info(
-                "%s - %s %s - %d - %.2fms",
-                client_host,
-                request.method,
-                request.url.path,
-                response.status_code,
-                process_time
-            )
-            return response
+            await self.app(scope, receive, send_with_status)
         except Exception as e:
             logger.error("Error processing request: %s", str(e), exc_info=True)
             raise
+        process_time: float = (time.perf_counter() - start_time) * 1000
+        logger.info(
+            "%s - %s %s - %d - %.2fms",
+            client_host,
+            method,
+            path,
+            status_code,
+            process_time
+        )
@@ -0,0 +1,51 @@
+import functools
+from collections.abc import Sequence
+from http import HTTPStatus
+
+from starlette.routing import BaseRoute, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..errors import MethodNotAllowedError
+from ..response.api_response import RawJSONResponse
+
+
+@functools.lru_cache(maxsize=64)
+def _method_not_allowed(method: str, allow: bytes) -> RawJSONResponse:
+    """Get the 405 response for a method on a path allowing ``allow``, built once per pair."""
+    return RawJSONResponse.build(
+        MethodNotAllowedError(method).body, HTTPStatus.METHOD_NOT_ALLOWED, (b"allow", allow)
+    )
+
+
+class MethodGuardMiddleware:
+    """ASGI middleware rejecting unsupported methods on known paths before the router runs.
+
+    The allowed (path, method) pairs are read from the routes once, so a disallowed request
+    only costs a set lookup and a pre-serialized body sent through ASGI.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute]) -> None:
+        self.app = app
+        allowed_methods: dict[str, set[str]] = {}
+        for route in routes:
+            # Parametrized paths can't be matched by a lookup, the router deals with them
+            if isinstance(route, Route) and route.methods and "{" not in route.path:
+                allowed_methods.setdefault(route.path, set()).update(route.methods)
+        self.allowed: frozenset[tuple[str, str]] = frozenset(
+            (path, method) for path, methods in allowed_methods.items() for method in methods
+        )
+        self.allow: dict[str, bytes] = {
+            path: ", ".join(sorted(methods)).encode() for path, methods in allowed_methods.items()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path: str = scope["path"]
+        method: str = scope["method"]
+        if (path, method) in self.allowed or path not in self.allow:
+            await self.app(scope, receive, send)
+            return
+
+        await _method_not_allowed(method, self.allow[path]).send(send)
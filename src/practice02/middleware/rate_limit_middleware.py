@@ -1,154 +1,156 @@
 import logging
+import math
 import time
+from collections import deque
+from itertools import repeat
 from http import HTTPStatus
-from typing import Callable, Awaitable
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .. import constants as const
 from ..errors import ENHANCE_YOUR_CALM
-from ..response.json_response import JSONProblem
-from ..state import State
+from ..response.api_response import RawJSONResponse
+from ..response.json_response import problem_body
+from ..state import RateBuckets, State
+from ..utils import get_client_ip
 
 logger: logging.Logger = logging.getLogger(__name__)
 
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware for rate limiting requests."""
-
-    async def dispatch(
-        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
-    ) -> Response:
+# Documentation and health checks are never rate limited
+_UNLIMITED_PATHS: frozenset[str] = frozenset({"/redoc", "/docs", "/openapi.json", "/health"})
+
+# The rejections are the responses sent the most under a flood, they are only built once
+_BLACKLISTED: RawJSONResponse = RawJSONResponse.build(
+    problem_body(
+        HTTPStatus.IM_A_TEAPOT,
+        "I'm a teapot",
+        HTTPStatus.IM_A_TEAPOT.description + "\n" + const.ERROR_BLACKLISTED_IP,
+    ),
+    HTTPStatus.IM_A_TEAPOT,
+)
+_TOO_FREQUENT: RawJSONResponse = RawJSONResponse.build(
+    problem_body(ENHANCE_YOUR_CALM, "Enhance Your Calm", "You are being rate limited"),
+    ENHANCE_YOUR_CALM,
+)
+_RATE_LIMIT_EXCEEDED: RawJSONResponse = RawJSONResponse.build(
+    problem_body(
+        HTTPStatus.TOO_MANY_REQUESTS,
+        "Too Many Requests",
+        f"{const.ERROR_RATE_LIMIT_EXCEEDED}. You have been blacklisted for "
+        f"{int(const.BLACKLIST_DURATION)} seconds.",
+    ),
+    HTTPStatus.TOO_MANY_REQUESTS,
+    (b"retry-after", str(int(const.BLACKLIST_DURATION)).encode()),
+)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware for rate limiting requests."""
+
+    def __init__(self, app: ASGIApp, state: State) -> None:
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process the request with rate limiting."""
-        client_ip: str = request.client.host if request.client else "unknown"
-        current_time: float = time.time()
+        if scope["type"] != "http" or scope["path"] in _UNLIMITED_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-        # Clean up old blacklisted IPs
-        self._cleanup_blacklisted_ips(current_time)
+        client_ip = get_client_ip(scope)
+        # Monotonic, like the blacklist TTLs, so wall clock adjustments can't skew the windows
+        current_time: float = time.monotonic()
 
-        if not self._should_apply_rate_limit(request):
-            return await call_next(request)
+        # Clean up IPs that went idle, blacklisted IPs expire on their own
+        self._cleanup_idle_ips(current_time)
 
         # Check if IP is blacklisted
-        if client_ip in State.blacklisted_ips:
-            return self._blacklisted_response()
-
-        # Initialize request timestamps for this IP
-        if client_ip not in State.request_timestamps:
-            State.request_timestamps[client_ip] = []
+        if client_ip in self.state.blacklisted_ips:
+            await _BLACKLISTED.send(send)
+            return
 
         # Process rate limiting
-        response = await self._process_rate_limit(
-            client_ip, current_time, request, call_next
-        )
-        return response
+        await self._process_rate_limit(client_ip, current_time, scope, receive, send)
 
-    @staticmethod
-    def _should_apply_rate_limit(request: Request) -> bool:
-        """Determine if rate limiting should be applied to the request."""
-        return request.url.path not in ["/redoc", "/docs", "/openapi.json"]
-
-    @staticmethod
-    def _cleanup_blacklisted_ips(current_time: float) -> None:
-        """Remove expired IPs from the blacklist."""
-        expired_ips = [
-            ip for ip, expiry in State.blacklisted_ips.items() if expiry < current_time
-        ]
-        for ip in expired_ips:
-            del State.blacklisted_ips[ip]
+    def _cleanup_idle_ips(self, current_time: float) -> None:
+        """Forget the request counters of IPs that have not made a request in a while.
 
-    @staticmethod
-    def _blacklisted_response() -> JSONResponse:
-        """Create a response for blacklisted IPs."""
-        return JSONResponse(
-            status_code=HTTPStatus.IM_A_TEAPOT,
-            content=JSONProblem(
-                status=str(HTTPStatus.IM_A_TEAPOT),
-                title="I'm a teapot",
-                detail=HTTPStatus.IM_A_TEAPOT.description
-                + "\n"
-                + const.ERROR_BLACKLISTED_IP,
-                detail_obj=HTTPStatus.IM_A_TEAPOT.description
-                + "\n"
-                + const.ERROR_BLACKLISTED_IP,
-                type=f"https://http.cat/{HTTPStatus.IM_A_TEAPOT}",
-            ).model_dump(),
-        )
+        The counters are kept in least recently seen order, so idle IPs are at the front.
+        """
+        request_buckets = self.state.request_buckets
+        while request_buckets:
+            rate_buckets = next(iter(request_buckets.values()))
+            if rate_buckets.last_request + const.RATE_LIMIT_IDLE_TTL >= current_time:
+                break
+            request_buckets.popitem(last=False)
 
     async def _process_rate_limit(
         self,
         client_ip: str,
         current_time: float,
-        request: Request,
-        call_next: Callable[[Request], Awaitable[Response]],
-    ) -> Response:
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
         """Process rate limiting for the request."""
-        timestamps = State.request_timestamps[client_ip]
-        window_start = current_time - const.RATE_LIMIT_WINDOW_SECONDS
-
-        # Remove old timestamps outside the current window
-        recent_timestamps = [ts for ts in timestamps if ts > window_start]
-        logger.info(f"{len(recent_timestamps)} / ({len(timestamps)}) recent requests by {client_ip}")
+        rate_buckets = self._update_buckets(client_ip, current_time)
+        recent_requests = rate_buckets.total
+        # Per request detail, the access log already records every request at INFO
+        logger.debug("%d recent requests by %s", recent_requests, client_ip)
         # Check for too many requests
-        should_blacklist = len(recent_timestamps) >= const.RATE_LIMIT_WINDOW_MAX_REQUESTS
-        requests_too_frequent = self._is_too_frequent(recent_timestamps, current_time)
-        # Update timestamps and process the request
-        recent_timestamps.append(current_time)
-        State.request_timestamps[client_ip] = recent_timestamps[
-            -const.MAX_TIMESTAMPS_STORED:
-        ]
+        should_blacklist = recent_requests >= const.RATE_LIMIT_WINDOW_MAX_REQUESTS
+        requests_too_frequent = self._is_too_frequent(rate_buckets, current_time)
+        # Count this request
+        rate_buckets.buckets[-1] += 1
+        rate_buckets.total += 1
+        rate_buckets.last_request = current_time
         if should_blacklist:
-            return self._blacklist_ip(client_ip, current_time)
-        if requests_too_frequent:
-            return self._request_too_frequent_response()
-
-        return await call_next(request)
+            await self._blacklist_ip(client_ip, send)
+        elif requests_too_frequent:
+            await _TOO_FREQUENT.send(send)
+        else:
+            await self.app(scope, receive, send)
+
+    def _update_buckets(self, client_ip: str, current_time: float) -> RateBuckets:
+        """Get the request counters for an IP, rotating out the buckets that left the window."""
+        bucket = int(current_time // const.RATE_LIMIT_BUCKET_SECONDS)
+        request_buckets = self.state.request_buckets
+        rate_buckets = request_buckets.get(client_ip)
+        if rate_buckets is None:
+            rate_buckets = RateBuckets(
+                buckets=deque(repeat(0, const.RATE_LIMIT_BUCKETS), maxlen=const.RATE_LIMIT_BUCKETS),
+                head_bucket=bucket,
+                total=0,
+                last_request=-math.inf,
+            )
+            request_buckets[client_ip] = rate_buckets
+            # Forget the least recently seen IP so memory stays bounded
+            if len(request_buckets) > const.MAX_IPS_TRACKED:
+                request_buckets.popitem(last=False)
+            return rate_buckets
+
+        request_buckets.move_to_end(client_ip)
+        elapsed_buckets = bucket - rate_buckets.head_bucket
+        if elapsed_buckets >= const.RATE_LIMIT_BUCKETS:
+            rate_buckets.buckets.extend(repeat(0, const.RATE_LIMIT_BUCKETS))
+            rate_buckets.total = 0
+            rate_buckets.head_bucket = bucket
+        elif elapsed_buckets > 0:
+            buckets = rate_buckets.buckets
+            for _ in range(elapsed_buckets):
+                # The deque's maxlen drops the oldest bucket from the left on append
+                rate_buckets.total -= buckets[0]
+                buckets.append(0)
+            rate_buckets.head_bucket = bucket
+        return rate_buckets
 
     @staticmethod
-    def _is_too_frequent(timestamps: list[float], current_time: float) -> bool:
+    def _is_too_frequent(rate_buckets: RateBuckets, current_time: float) -> bool:
         """Check if requests are coming in too quickly."""
-        return (
-            len(timestamps) > 0
-            and (current_time - timestamps[-1]) < const.RATE_LIMIT_MIN_INTERVAL
-        )
+        return (current_time - rate_buckets.last_request) < const.RATE_LIMIT_MIN_INTERVAL
 
-    @staticmethod
-    def _request_too_frequent_response() -> JSONResponse:
-        """Create a 420 Enhance Your Calm response."""
-        return JSONResponse(
-            status_code=ENHANCE_YOUR_CALM,
-            content=JSONProblem(
-                status=str(ENHANCE_YOUR_CALM),
-                title="Enhance Your Calm",
-                detail="You are being rate limited",
-                detail_obj="You are being rate limited",
-                type=f"https://http.cat/{ENHANCE_YOUR_CALM}",
-            ).model_dump(),
-        )
-
-    @staticmethod
-    def _blacklist_ip(
-        client_ip: str, current_time: float
-    ) -> JSONResponse:
+    async def _blacklist_ip(self, client_ip: str, send: Send) -> None:
         """Handle rate limit exceeded by blacklisting the IP."""
-        State.blacklisted_ips[client_ip] = current_time + const.BLACKLIST_DURATION
-        logger.warning(f"Blacklisted IP: {client_ip}")
-        return JSONResponse(
-            status_code=HTTPStatus.TOO_MANY_REQUESTS,
-            headers={"Retry-After": str(int(const.BLACKLIST_DURATION))},
-            content=JSONProblem(
-                status=str(HTTPStatus.TOO_MANY_REQUESTS),
-                title="Too Many Requests",
-                detail=(
-                    f"Rate limit exceeded. You have been blacklisted for "
-                    f"{int(const.BLACKLIST_DURATION)} seconds."
-                ),
-                detail_obj=(
-                    f"Rate limit exceeded. You have been blacklisted for "
-                    f"{int(const.BLACKLIST_DURATION)} seconds."
-                ),
-                type=f"https://http.cat/{HTTPStatus.TOO_MANY_REQUESTS}",
-            ).model_dump(),
-        )
+        self.state.blacklisted_ips.add(client_ip)
+        logger.warning("Blacklisted IP: %s", client_ip)
+        await _RATE_LIMIT_EXCEEDED.send(send)
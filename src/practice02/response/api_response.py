@@ -1,7 +1,10 @@
+from dataclasses import dataclass
 from http import HTTPStatus
 from typing import Self
 
 from pydantic import BaseModel
+from starlette.responses import Response
+from starlette.types import Send
 
 from ..errors import APIError
 
@@ -20,4 +23,43 @@ def get_error_api_response(error: APIError) -> APIResponse[dict[str, str]]:
     return APIResponse(
         status=str(error.status_code),
         data={"error": error.detail}
-    )
\ No newline at end of file
+    )
+
+def cached_json_response(body: bytes, status_code: int = HTTPStatus.OK) -> Response:
+    """Wrap an already serialized JSON body in a new response.
+
+    FastAPI mutates the response objects returned by handlers (e.g. background tasks),
+    so only the bytes can be shared between requests, not the response itself.
+    """
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+@dataclass(frozen=True, slots=True)
+class RawJSONResponse:
+    """An already serialized JSON response, headers included, sent straight through ASGI.
+
+    For middlewares answering before the app runs: built once, then sent to any number of requests.
+    """
+    status_code: int
+    body: bytes
+    headers: tuple[tuple[bytes, bytes], ...]
+
+    @classmethod
+    def build(cls, body: bytes, status_code: int, *headers: tuple[bytes, bytes]) -> Self:
+        """Wrap a serialized JSON body, computing its content headers once."""
+        return cls(
+            status_code=status_code,
+            body=body,
+            headers=(
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ),
+        )
+
+    async def send(self, send: Send) -> None:
+        """Send the response, the header list is copied as outer middlewares may edit it in place."""
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": list(self.headers)}
+        )
+        await send({"type": "http.response.body", "body": self.body})
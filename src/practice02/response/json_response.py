@@ -1,34 +1,57 @@
+import functools
 from http import HTTPStatus
 from typing import Any
 
+import orjson
 from pydantic import BaseModel
 
-from ..errors import APIError
+from ..errors import ENHANCE_YOUR_CALM
+
+# Status strings and problem type URLs for every known status code, so they are not formatted per error
+_STATUS_STRINGS: dict[int, str] = {
+    int(code): str(int(code)) for code in [*HTTPStatus, ENHANCE_YOUR_CALM]
+}
+_PROBLEM_TYPE_URLS: dict[int, str] = {
+    code: f"https://http.cat/{status}" for code, status in _STATUS_STRINGS.items()
+}
+
+
+def problem_type_url(status_code: int) -> str:
+    """Get the problem type URL documenting a status code."""
+    url = _PROBLEM_TYPE_URLS.get(status_code)
+    return url if url is not None else f"https://http.cat/{status_code}"
 
 
 class JSONProblem(BaseModel):
-    """Standard error response format following RFC 7807."""
+    """Standard error response format following RFC 7807.
+
+    Documents the shape of the error bodies, which are built by ``problem_payload``.
+    """
     status: str
     title: str
     detail: str
     detail_obj: Any
     type: str = "about:blank"
 
-    @classmethod
-    def from_exception(cls, exc: Exception) -> 'JSONProblem':
-        """Create a JSON problem from an exception."""
-        if isinstance(exc, APIError):
-            return cls(
-                status=str(exc.status_code),
-                title=exc.title,
-                detail=exc.detail,
-                detail_obj=exc.detail,
-                type=f"https://http.cat/{exc.status_code}"
-            )
-        return cls(
-            status=str(HTTPStatus.INTERNAL_SERVER_ERROR),
-            title="Internal Server Error",
-            detail=HTTPStatus.INTERNAL_SERVER_ERROR.description,
-            detail_obj=HTTPStatus.INTERNAL_SERVER_ERROR.description,
-            type="https://http.cat/500"
-        )
+
+def problem_payload(status_code: int, title: str, detail: str, detail_obj: Any) -> dict[str, Any]:
+    """Build a JSON problem as a plain dict.
+
+    Same shape as ``JSONProblem(...).model_dump()``, without validating and dumping a model per error.
+    """
+    return {
+        "status": _STATUS_STRINGS.get(status_code) or str(status_code),
+        "title": title,
+        "detail": detail,
+        "detail_obj": detail_obj,
+        "type": problem_type_url(status_code),
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def problem_body(status_code: int, title: str, detail: str) -> bytes:
+    """Serialize an error as a JSON problem.
+
+    API errors are raised with a small, fixed set of arguments, so the encoded body is memoized.
+    """
+    return orjson.dumps(problem_payload(status_code, title, detail, detail))
@@ -0,0 +1,18 @@
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson instead of the stdlib encoder.
+
+    FastAPI ships its own ``ORJSONResponse`` but newer releases deprecate it, so we keep a minimal copy.
+    """
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson only handles 64 bit ints, validation errors can echo back larger ones
+            return super().render(content)
@@ -1,16 +1,28 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
 from typing import Optional
 
 from . import constants as const
+from .utils import TTLSet
 
 
+@dataclass(slots=True)
+class RateBuckets:
+    """Per-bucket request counters for a single client, covering one rate limit window."""
+    buckets: deque[int]  # Request counts, oldest first, bounded to RATE_LIMIT_BUCKETS
+    head_bucket: int  # Bucket number (monotonic time // bucket size) of the last, current bucket
+    total: int  # Sum of the buckets, kept up to date instead of summed per request
+    last_request: float  # Timestamp of the latest request
+
+
+@dataclass(slots=True)
 class State:
-    # In-memory storage
+    """In-memory storage of one app, created by ``create_app`` and shared with its middlewares."""
     motd: Optional[str] = const.DEFAULT_MOTD
-    special_numbers: set[int] = set()
+    special_numbers: set[int] = field(default_factory=set)
 
     # Rate limiting storage
-    request_timestamps: dict[str, list[float]] = {}
-    blacklisted_ips: dict[str, float] = {}
-
-    def __init__(self) -> None:
-        raise NotImplementedError()
+    request_buckets: OrderedDict[str, RateBuckets] = field(default_factory=OrderedDict)
+    blacklisted_ips: TTLSet[str] = field(
+        default_factory=lambda: TTLSet(ttl=const.BLACKLIST_DURATION, maxsize=const.MAX_BLACKLISTED_IPS)
+    )
@@ -1,23 +1,191 @@
+import functools
 import math
+import time
+from collections.abc import Callable, Hashable, MutableMapping
+from typing import Any, Final, cast
+
+from . import constants as const
+
+
+def _sieve(limit: int) -> frozenset[int]:
+    """Compute all primes up to ``limit`` (inclusive) with the Sieve of Eratosthenes.
+
+    Args:
+        limit: The largest number to consider.
+
+    Returns:
+        frozenset[int]: The primes in ``[2, limit]``.
+    """
+    if limit < 2:
+        return frozenset()
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0] = sieve[1] = 0
+    for i in range(2, math.isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i :: i] = bytes(len(range(i * i, limit + 1, i)))
+    return frozenset(i for i, flag in enumerate(sieve) if flag)
+
+
+# The endpoint never accepts numbers above PRIME_NUMBER_MAX, so every answer can be precomputed.
+_PRIMES: frozenset[int] = _sieve(const.PRIME_NUMBER_MAX)
+
+
+def _trial_division(n: int) -> bool:
+    """Check a number not divisible by 2 or 3 for primality, by trial division over a 6k ± 1 wheel.
+
+    Kept to plain integer arithmetic so it can be compiled by numba.
+    """
+    # math.isqrt is not supported by numba, correct the float estimate instead
+    limit = int(math.sqrt(n))
+    while limit * limit > n:
+        limit -= 1
+    while (limit + 1) * (limit + 1) <= n:
+        limit += 1
+    i = 5
+    while i <= limit:
+        if n % i == 0 or n % (i + 2) == 0:
+            return False
+        i += 6
+    return True
+
+
+# Miller-Rabin with the first 13 primes as witnesses is deterministic below this bound (Sorenson & Webster)
+_MILLER_RABIN_WITNESSES: Final[tuple[int, ...]] = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_MILLER_RABIN_MAX: Final[int] = 3_317_044_064_679_887_385_961_981
+# Added above that bound, where no fixed set of witnesses is known to be enough
+_MILLER_RABIN_EXTRA_WITNESSES: Final[tuple[int, ...]] = (43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97)
+
+
+def _miller_rabin(n: int, witnesses: tuple[int, ...]) -> bool:
+    """Check an odd number above every witness for primality, with the Miller-Rabin test."""
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in witnesses:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+# Below this the compiled trial division beats Miller-Rabin, above it the O(√n) loop gets too long
+_COMPILED_MAX: Final[int] = 2**32
+
+
+@functools.cache
+def _compiled_trial_division() -> Callable[[int], bool] | None:
+    """Compile the trial division with numba, on first use as the endpoint never needs it.
+
+    Returns:
+        Callable[[int], bool] | None: The compiled function, or None if numba is not installed.
+    """
+    try:
+        from numba import njit
+    except ImportError:  # numba is optional, installed with the "jit" extra
+        return None
+    # Without the GIL, callers running it in worker threads do not block the event loop thread
+    compiled: Callable[[int], bool] = njit(cache=True, nogil=True)(_trial_division)
+    return compiled
 
 
 def is_prime(n: int) -> bool:
     """Check if a number is prime.
 
+    Deterministic below ``_MILLER_RABIN_MAX`` (about 3.3e24). Above it this is a probable-prime
+    test against the 25 fixed bases up to 97, with no error bound: a strong pseudoprime to all of
+    them would be reported prime.
+
     Args:
         n: The number to check.
 
     Returns:
         bool: True if the number is prime, False otherwise.
     """
-    if n < 2:
-        return False
-    if n % 2 == 0:
-        return n == 2
-
-    # Check odd divisors up to square root
-    sqrt_n = int(math.isqrt(n)) + 1
-    for i in range(3, sqrt_n, 2):
-        if n % i == 0:
+    if n <= const.PRIME_NUMBER_MAX:
+        return n in _PRIMES
+    # n is above every witness here, so being divisible by one means it is composite
+    for p in _MILLER_RABIN_WITNESSES:
+        if n % p == 0:
             return False
-    return True
+    if n < _COMPILED_MAX:
+        compiled_trial_division = _compiled_trial_division()
+        if compiled_trial_division is not None:
+            return compiled_trial_division(n)
+    if n < _MILLER_RABIN_MAX:
+        return _miller_rabin(n, _MILLER_RABIN_WITNESSES)
+    return _miller_rabin(n, _MILLER_RABIN_WITNESSES + _MILLER_RABIN_EXTRA_WITNESSES)
+
+
+def get_client_ip(scope: MutableMapping[str, Any]) -> str:
+    """Get the client IP of a request.
+
+    It is extracted once, by whichever middleware asks first, and stored in the ASGI scope
+    so the other middlewares and the handlers reuse it.
+
+    Args:
+        scope: The ASGI scope of the request.
+
+    Returns:
+        str: The client IP, or "unknown" if the server did not provide it.
+    """
+    client_ip: str | None = scope.get("client_ip")
+    if client_ip is None:
+        client = scope.get("client")
+        client_ip = scope["client_ip"] = client[0] if client else "unknown"
+    return client_ip
+
+
+class TTLSet[T: Hashable]:
+    """Set whose members expire a fixed time after being added.
+
+    Expired members are dropped lazily when looked up, or when new members are added.
+    Past ``maxsize`` members the oldest one is evicted, so memory stays bounded.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, timer: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.timer = timer
+        # All members share the same TTL, so insertion order is also expiry order
+        self._expiries: dict[T, float] = {}
+
+    def add(self, member: T) -> None:
+        """Add a member, restarting its TTL if it was already present."""
+        now = self.timer()
+        self._expiries.pop(member, None)
+        self._expiries[member] = now + self.ttl
+        self.expire(now)
+        if len(self._expiries) > self.maxsize:
+            del self._expiries[next(iter(self._expiries))]
+
+    def expire(self, now: float | None = None) -> None:
+        """Drop the members whose TTL has run out."""
+        if now is None:
+            now = self.timer()
+        expiries = self._expiries
+        while expiries:
+            member, expiry = next(iter(expiries.items()))
+            if expiry >= now:
+                break
+            del expiries[member]
+
+    def __contains__(self, member: object) -> bool:
+        key = cast(T, member)
+        expiry = self._expiries.get(key)
+        if expiry is None:
+            return False
+        if expiry < self.timer():
+            del self._expiries[key]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._expiries)
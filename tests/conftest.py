@@ -1,20 +1,48 @@
 """Test configuration and fixtures."""
+import itertools
 from collections.abc import Generator
 
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from practice02 import constants as const
 from practice02.main import create_app
+from practice02.state import State
 
-@pytest.fixture(scope="module")
-def test_app() -> Generator[TestClient, None]:
+# Shared by all the tests so no two of them ever use the same number
+_numbers = itertools.count(10_000)
+
+@pytest.fixture(scope="session")
+def app() -> FastAPI:
+    """Create the FastAPI application shared by the whole test session."""
+    return create_app(enable_rate_limiting=False)
+
+@pytest.fixture(scope="session")
+def test_app(app: FastAPI) -> Generator[TestClient, None]:
     """Create a test client for the FastAPI application."""
-    test_app = create_app(enable_rate_limiting=False)
-    with TestClient(test_app) as client:
+    with TestClient(app) as client:
         yield client
 
-@pytest.fixture(scope="module")
+@pytest.fixture
+def store(app: FastAPI) -> State:
+    """Return the in-memory storage of the application, to set up state without a request."""
+    state: State = app.state.store
+    return state
+
+@pytest.fixture(autouse=True)
+def reset_state(store: State) -> None:
+    """Reset the in-memory storage before each test, as the app is shared by all of them."""
+    store.motd = const.DEFAULT_MOTD
+    store.special_numbers.clear()
+
+@pytest.fixture(scope="session")
 def auth_headers() -> dict[str, str]:
     """Return headers for authenticated requests."""
     # We don't really do any authentication yet, but it is convenient to add the JSON content type header here.
     return {"Content-Type": "application/json"}
+
+@pytest.fixture
+def unique_number() -> int:
+    """Return a positive number no other test uses."""
+    return next(_numbers)
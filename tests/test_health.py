@@ -0,0 +1,21 @@
+"""Tests for the health check endpoint (/health)."""
+from fastapi.testclient import TestClient
+
+
+class TestHealthEndpoint:
+    """Test cases for the health check endpoint."""
+
+    def test_health_check(self, test_app: TestClient) -> None:
+        """Test GET /health reports the service as healthy."""
+        response = test_app.get("/health")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        data = response.json()
+        assert data["status"] == "200"
+        assert data["data"]["status"] == "healthy"
+
+    def test_documented(self, test_app: TestClient) -> None:
+        """Test /health and /my_ip are listed in the OpenAPI schema like the other endpoints."""
+        paths = test_app.get("/openapi.json").json()["paths"]
+        assert "get" in paths["/health"]
+        assert "get" in paths["/my_ip"]
@@ -0,0 +1,33 @@
+"""Tests for the unsupported methods on the known endpoints."""
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.mark.parametrize(
+    ("path", "method"),
+    [
+        ("/", "POST"),
+        ("/", "PUT"),
+        ("/", "DELETE"),
+        ("/my_ip", "POST"),
+        ("/my_ip", "PUT"),
+        ("/my_ip", "DELETE"),
+        ("/motd", "POST"),
+    ],
+)
+def test_method_not_allowed(test_app: TestClient, path: str, method: str) -> None:
+    """Test that unsupported methods return 405 without advertising themselves as allowed."""
+    response = test_app.request(method, path)
+    assert response.status_code == 405
+    assert method not in response.headers["allow"].split(", ")
+    data = response.json()
+    assert data["status"] == "405"
+    assert "Method Not Allowed" in data["title"]
+
+
+@pytest.mark.parametrize("path", ["/", "/my_ip", "/health"])
+def test_head_not_allowed(test_app: TestClient, path: str) -> None:
+    """Test that HEAD is rejected on the GET endpoints, as they don't declare it."""
+    response = test_app.head(path)
+    assert response.status_code == 405
+    assert response.headers["allow"] == "GET"
@@ -0,0 +1,89 @@
+"""Tests for the rate limiting middleware."""
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from practice02 import constants as const
+from practice02.main import create_app
+from practice02.middleware import rate_limit_middleware
+from practice02.state import State
+
+
+class _Clock:
+    """Stand-in for the time module in the rate limiter, so the tests control the windows."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def limited_app() -> Generator[TestClient, None]:
+    """Create a test client with rate limiting enabled, each app starts with a clean state."""
+    with TestClient(create_app(enable_rate_limiting=True)) as client:
+        yield client
+
+
+class TestRateLimitMiddleware:
+    """Test cases for the rate limiting middleware."""
+
+    def test_first_request_allowed(self, limited_app: TestClient) -> None:
+        """Test that a single request goes through."""
+        response = limited_app.get("/my_ip")
+        assert response.status_code == 200
+
+    def test_too_frequent_requests(self, limited_app: TestClient) -> None:
+        """Test that back to back requests return 420 (Enhance Your Calm)."""
+        limited_app.get("/my_ip")
+        response = limited_app.get("/my_ip")
+        assert response.status_code == 420
+        data = response.json()
+        assert data["status"] == "420"
+        assert data["title"] == "Enhance Your Calm"
+
+    def test_blacklisting(self, limited_app: TestClient) -> None:
+        """Test that flooding the API blacklists the client."""
+        responses = [
+            limited_app.get("/my_ip") for _ in range(const.RATE_LIMIT_WINDOW_MAX_REQUESTS + 1)
+        ]
+        assert responses[-1].status_code == 429
+        assert responses[-1].headers["retry-after"] == str(int(const.BLACKLIST_DURATION))
+
+        response = limited_app.get("/my_ip")
+        assert response.status_code == 418
+        data = response.json()
+        assert data["status"] == "418"
+        assert const.ERROR_BLACKLISTED_IP in data["detail"]
+
+    @pytest.mark.parametrize("path", ["/openapi.json", "/health"])
+    def test_path_not_rate_limited(self, limited_app: TestClient, path: str) -> None:
+        """Test that the documentation and health check endpoints are not rate limited."""
+        for _ in range(const.RATE_LIMIT_WINDOW_MAX_REQUESTS + 1):
+            assert limited_app.get(path).status_code == 200
+
+    def test_window_slides(self, limited_app: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that requests stop counting once their bucket leaves the window."""
+        clock = _Clock()
+        monkeypatch.setattr(rate_limit_middleware, "time", clock)
+        store: State = limited_app.app.state.store  # type: ignore[attr-defined]
+
+        # One request per bucket, as often as allowed, for two windows
+        for i in range(2 * const.RATE_LIMIT_BUCKETS):
+            clock.now = i * const.RATE_LIMIT_MIN_INTERVAL
+            assert limited_app.get("/my_ip").status_code == 200
+            assert store.request_buckets["testclient"].total == min(i + 1, const.RATE_LIMIT_BUCKETS)
+
+        # Half a window later, only the requests of the last half are still counted
+        clock.now += const.RATE_LIMIT_WINDOW_SECONDS / 2
+        assert limited_app.get("/my_ip").status_code == 200
+        rate_buckets = store.request_buckets["testclient"]
+        assert rate_buckets.total == const.RATE_LIMIT_BUCKETS // 2 + 1
+
+        # Requests rejected as too frequent still count, until the window is full
+        clock.now += const.RATE_LIMIT_MIN_INTERVAL / 5
+        while rate_buckets.total < const.RATE_LIMIT_WINDOW_MAX_REQUESTS:
+            assert limited_app.get("/my_ip").status_code == 420
+        assert limited_app.get("/my_ip").status_code == 429
@@ -1,7 +1,8 @@
 """Tests for the root endpoint (/)."""
-import pytest
 from fastapi.testclient import TestClient
 
+from practice02.state import State
+
 
 class TestRootEndpoint:
     """Test cases for the root endpoint."""
@@ -14,16 +15,13 @@ class TestRootEndpoint:
         assert data["status"] == "200"
         assert "Hello" in data["data"]
         assert "last_motd" in data["data"]
-    
-    @pytest.mark.parametrize("method", ["POST", "PUT", "DELETE"])
-    def test_unsupported_methods(
-        self, 
-        test_app: TestClient, 
-        method: str
-    ) -> None:
-        """Test that unsupported methods return 405."""
-        response = test_app.request(method, "/")
-        assert response.status_code == 405
-        data = response.json()
-        assert data["status"] == "405"
-        assert "Method Not Allowed" in data["title"]
+
+    def test_get_root_shows_motd(self, test_app: TestClient, store: State) -> None:
+        """Test GET / reflects the stored MOTD, which the MOTD tests don't read back."""
+        store.motd = "Test MOTD"
+        response = test_app.get("/")
+        assert response.json()["data"]["last_motd"] == "Test MOTD"
+
+        store.motd = None
+        response = test_app.get("/")
+        assert response.json()["data"].get("last_motd") is None
@@ -1,16 +1,20 @@
 """Tests for the special number endpoints (/special_number)."""
 from fastapi.testclient import TestClient
 
+from practice02.state import State
+
 class TestSpecialNumberEndpoints:
     """Test cases for the special number endpoints."""
     
     def test_create_special_number(
         self, 
         test_app: TestClient, 
-        auth_headers: dict[str, str]
+        auth_headers: dict[str, str],
+        store: State,
+        unique_number: int
     ) -> None:
         """Test creating a special number."""
-        number = 42
+        number = unique_number
         response = test_app.post(
             "/special_number",
             json={"number": number},
@@ -22,17 +26,16 @@ class TestSpecialNumberEndpoints:
         assert data["data"]["ok"] is True
         
         # Verify the number was added
-        response = test_app.get(f"/special_number?number={number}")
-        assert response.status_code == 200
-        assert response.json()["data"]["ok"] is True
+        assert number in store.special_numbers
     
     def test_create_duplicate_special_number(
         self, 
         test_app: TestClient, 
-        auth_headers: dict[str, str]
+        auth_headers: dict[str, str],
+        unique_number: int
     ) -> None:
         """Test that creating a duplicate special number returns 409."""
-        number = 123
+        number = unique_number
         # First create
         test_app.post("/special_number", json={"number": number}, headers=auth_headers)
         
@@ -50,10 +53,11 @@ class TestSpecialNumberEndpoints:
     def test_update_special_number(
         self, 
         test_app: TestClient, 
-        auth_headers: dict[str, str]
+        auth_headers: dict[str, str],
+        unique_number: int
     ) -> None:
         """Test updating a special number (idempotent operation)."""
-        number = 420
+        number = unique_number
         # First create
         response = test_app.put(
             "/special_number",
@@ -73,10 +77,12 @@ class TestSpecialNumberEndpoints:
     def test_delete_special_number(
         self, 
         test_app: TestClient, 
-        auth_headers: dict[str, str]
+        auth_headers: dict[str, str],
+        store: State,
+        unique_number: int
     ) -> None:
         """Test deleting a special number."""
-        number = 555
+        number = unique_number
         # First create
         test_app.post("/special_number", json={"number": number}, headers=auth_headers)
         
@@ -93,19 +99,19 @@ class TestSpecialNumberEndpoints:
         assert data["data"]["ok"] is True
         
         # Verify deletion
-        response = test_app.get(f"/special_number?number={number}")
-        assert response.status_code == 404
+        assert number not in store.special_numbers
     
     def test_delete_nonexistent_special_number(
         self, 
         test_app: TestClient, 
-        auth_headers: dict[str, str]
+        auth_headers: dict[str, str],
+        unique_number: int
     ) -> None:
         """Test deleting a non-existent special number returns 404."""
         response = test_app.request(
             "DELETE",
             "/special_number",
-            json={"number": 999999},
+            json={"number": unique_number},
             headers=auth_headers
         )
         assert response.status_code == 404
@@ -116,10 +122,11 @@ class TestSpecialNumberEndpoints:
     def test_check_special_number(
         self, 
         test_app: TestClient, 
-        auth_headers: dict[str, str]
+        auth_headers: dict[str, str],
+        unique_number: int
     ) -> None:
         """Test checking if a number is special."""
-        number = 42
+        number = unique_number
         # First make it special
         test_app.post("/special_number", json={"number": number}, headers=auth_headers)
         
@@ -130,11 +137,36 @@ class TestSpecialNumberEndpoints:
         assert data["status"] == "200"
         assert data["data"]["ok"] is True
     
-    def test_check_non_special_number(self, test_app: TestClient) -> None:
+    def test_check_non_special_number(self, test_app: TestClient, unique_number: int) -> None:
         """Test checking a non-special number returns 404."""
-        number = 123456  # Assuming this is not special
+        number = unique_number
         response = test_app.get(f"/special_number?number={number}")
         assert response.status_code == 404
         data = response.json()
         assert data["status"] == "404"
         assert "not found" in data["title"].lower()
+    
+    def test_unsupported_method(self, test_app: TestClient) -> None:
+        """Test that unsupported methods return 405 with the allowed methods."""
+        response = test_app.patch("/special_number")
+        assert response.status_code == 405
+        assert response.headers["allow"] == "DELETE, GET, POST, PUT"
+        data = response.json()
+        assert data["status"] == "405"
+        assert data["detail"] == "PATCH method not allowed"
+    
+    def test_create_big_negative_number(
+        self, 
+        test_app: TestClient, 
+        auth_headers: dict[str, str]
+    ) -> None:
+        """Test that a number too big for 64 bits is still rejected with 422."""
+        response = test_app.post(
+            "/special_number",
+            json={"number": -100000000000000000000000000000},
+            headers=auth_headers
+        )
+        assert response.status_code == 422
+        data = response.json()
+        assert data["status"] == "422"
+        assert data["detail_obj"][0]["input"] == -100000000000000000000000000000
@@ -0,0 +1,82 @@
+"""Tests for the helpers in utils."""
+import pytest
+
+from practice02.utils import TTLSet, _sieve, is_prime
+
+
+class FakeTimer:
+    """Clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLSet:
+    """Test cases for the TTLSet container."""
+
+    def test_member_expires(self) -> None:
+        """Test that members are only contained until their TTL runs out."""
+        timer = FakeTimer()
+        ttl_set: TTLSet[str] = TTLSet(ttl=10.0, maxsize=10, timer=timer)
+        ttl_set.add("a")
+        assert "a" in ttl_set
+        timer.now = 10.0
+        assert "a" in ttl_set
+        timer.now = 10.5
+        assert "a" not in ttl_set
+        assert len(ttl_set) == 0
+
+    def test_add_expires_old_members(self) -> None:
+        """Test that adding a member drops the expired ones."""
+        timer = FakeTimer()
+        ttl_set: TTLSet[str] = TTLSet(ttl=1.0, maxsize=10, timer=timer)
+        ttl_set.add("a")
+        ttl_set.add("b")
+        timer.now = 5.0
+        ttl_set.add("c")
+        assert len(ttl_set) == 1
+        assert "c" in ttl_set
+
+    def test_maxsize_evicts_oldest(self) -> None:
+        """Test that the oldest member is evicted once the set is full."""
+        ttl_set: TTLSet[int] = TTLSet(ttl=60.0, maxsize=2, timer=FakeTimer())
+        for member in (1, 2, 3):
+            ttl_set.add(member)
+        assert 1 not in ttl_set
+        assert 2 in ttl_set
+        assert 3 in ttl_set
+
+
+class TestIsPrime:
+    """Test cases for the is_prime helper, beyond the numbers the endpoint accepts."""
+
+    def test_matches_sieve(self) -> None:
+        """Test that every code path agrees with a sieve."""
+        limit = 20_000
+        assert {n for n in range(limit + 1) if is_prime(n)} == _sieve(limit)
+
+    @pytest.mark.parametrize(
+        "n", [2_147_483_647, 999_999_000_001, 2**61 - 1, 2**89 - 1]
+    )
+    def test_large_primes(self, n: int) -> None:
+        """Test large primes, on both sides of the deterministic Miller-Rabin bound."""
+        assert is_prime(n)
+
+    @pytest.mark.parametrize(
+        # Strong pseudoprimes to the bases 2 to 7, to 2, 7 and 61, to the primes up to 31 and up to 37,
+        # all above the sieve, and a semiprime above 2**64
+        "n",
+        [
+            3_215_031_751,
+            4_759_123_141,
+            3_825_123_056_546_413_051,
+            318_665_857_834_031_151_167_461,
+            999_999_000_001 * 2_147_483_647,
+        ],
+    )
+    def test_large_composites(self, n: int) -> None:
+        """Test composites that fool Miller-Rabin with fewer witnesses."""
+        assert not is_prime(n)